@@ -2,11 +2,13 @@ import os
 import sys
 import json
 import logging
+import argparse
 import requests
 import time
 
 from splinter import Browser
 
+from profiling import Profiler, dumps_profiles, profile_phase
 from utils import prepare_logs_dir
 
 CURRENT_PATH = os.path.abspath(os.path.dirname(__file__))
@@ -40,12 +42,15 @@ class Exchanger:
     """
     DOWNLOADS_DIR = 'downloads'
 
-    def __init__(self, vacancy_url, user_data):
+    def __init__(self, vacancy_url, user_data, profile_dir=None):
         """
         Init class
         :param vacancy_url: url of vacancy page
         :param user_data: dict with user data
+        :param profile_dir: directory to save profiles of applying phases,
+                            profiling is off if None
         """
+        self.profiler = Profiler(profile_dir) if profile_dir else None
         self.browser = self._setup_browser()
         self.vacancy_url = vacancy_url
         self.user_data = user_data
@@ -199,23 +204,34 @@ class Exchanger:
         self._accept()
         self._skip_password()
 
+    @dumps_profiles
     def run(self):
         """
         Run process of applying job
         """
-        self._open_page()
-        # wait until all items are loaded
-        self.browser.is_element_not_present_by_id('___l', 1)
-        self._upload_file()
-        self._fill_inputs()
-        self._submit()
+        with profile_phase(self.profiler, 'open_page'):
+            self._open_page()
+            # wait until all items are loaded
+            self.browser.is_element_not_present_by_id('___l', 1)
+        with profile_phase(self.profiler, 'upload_file'):
+            self._upload_file()
+        with profile_phase(self.profiler, 'fill_inputs'):
+            self._fill_inputs()
+        with profile_phase(self.profiler, 'submit'):
+            self._submit()
         logging.info('##### Vacancy accepted successfully #####')
         self.browser.quit()
 
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Exchanger')
+    arg_parser.add_argument('--profile', metavar='DIR',
+                            help='save profiles of applying phases to '
+                                 'directory')
+    args = arg_parser.parse_args()
     url = 'https://karriere.mcdonalds.de/stellenangebot/' \
           'job-detail.html?jobId=req12149'
     data = json.load(open('test_user_data.json'))
-    parser = Exchanger(user_data=data, vacancy_url=url)
+    parser = Exchanger(user_data=data, vacancy_url=url,
+                       profile_dir=args.profile)
     parser.run()
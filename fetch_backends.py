@@ -0,0 +1,210 @@
+import abc
+import asyncio
+import logging
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests as rq
+from requests.adapters import HTTPAdapter
+
+# Response of asyncio backend with the same fields as used from
+# requests.Response
+FetchResponse = namedtuple('FetchResponse', ['url', 'status_code', 'text'])
+
+
+def make_session(pool_size):
+    """
+    Create requests session keeping up to pool_size connections per host
+    :param pool_size: number of connections
+    :return: requests.Session object
+    """
+    session = rq.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class FetchBackend(abc.ABC):
+    """
+    Base class of backends fetching pages concurrently
+    """
+    name = None
+
+    def __init__(self, workers_num, **request_kwargs):
+        """
+        Init class
+        :param workers_num: the maximum number of requests sent at one time
+        :param request_kwargs: keyword arguments of requests.get,
+                               e.g. timeout, headers, verify
+        """
+        self.workers_num = workers_num
+        self.request_kwargs = request_kwargs
+
+    @abc.abstractmethod
+    def fetch(self, urls, exception_handler=None):
+        """
+        Fetch pages concurrently
+        :param urls: list of urls
+        :param exception_handler: function called with url and exception
+                                  when request failed
+        :return: generator of responses with url, status_code and text,
+                 in order of completion
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _handle_exception(exception_handler, url, exception):
+        """
+        Pass failed request to exception handler
+        """
+        if exception_handler is not None:
+            exception_handler(url, exception)
+
+
+class GeventBackend(FetchBackend):
+    """
+    Backend based on grequests. The process has to be monkey-patched by
+    gevent before requests and ssl are imported, so applications using
+    this backend have to `import grequests` before other imports
+    """
+    name = 'gevent'
+
+    def __init__(self, workers_num, **request_kwargs):
+        super().__init__(workers_num, **request_kwargs)
+        from gevent import monkey
+        # patching ssl after it was imported leads to RecursionError or
+        # broken https requests, so late patching is refused
+        if not monkey.is_module_patched('ssl'):
+            raise RuntimeError(
+                'gevent fetch backend needs the process to be patched before '
+                'requests and ssl are imported, import grequests first or '
+                'use threads or asyncio backend')
+        self.session = make_session(workers_num)
+
+    def fetch(self, urls, exception_handler=None):
+        import grequests as grq
+
+        rs = [grq.get(url, session=self.session, **self.request_kwargs)
+              for url in urls]
+        for r in grq.imap(rs, size=self.workers_num,
+                          exception_handler=lambda request, exception:
+                          self._handle_exception(exception_handler,
+                                                 request.url, exception)):
+            yield r
+
+
+class ThreadPoolBackend(FetchBackend):
+    """
+    Backend based on concurrent.futures thread pool. The pool lives as long
+    as the backend, each thread keeps its own session with open connections
+    """
+    name = 'threads'
+
+    def __init__(self, workers_num, **request_kwargs):
+        super().__init__(workers_num, **request_kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=workers_num)
+        self._local = threading.local()
+
+    def _get(self, url):
+        """
+        Request url with session of current thread
+        :param url: url
+        :return: requests.Response object
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = make_session(1)
+        return session.get(url, **self.request_kwargs)
+
+    def fetch(self, urls, exception_handler=None):
+        futures = {self.executor.submit(self._get, url): url for url in urls}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                self._handle_exception(exception_handler, futures[future], e)
+
+
+class AsyncioBackend(FetchBackend):
+    """
+    Backend based on asyncio event loop and aiohttp
+    """
+    name = 'asyncio'
+
+    def _session_kwargs(self, aiohttp):
+        """
+        Translate requests keyword arguments to aiohttp session arguments
+        :param aiohttp: aiohttp module
+        :return: dict with session arguments
+        """
+        connector_kwargs = {'limit': self.workers_num}
+        if self.request_kwargs.get('verify') is False:
+            connector_kwargs['ssl'] = False
+        kwargs = {'connector': aiohttp.TCPConnector(**connector_kwargs)}
+        if 'timeout' in self.request_kwargs:
+            kwargs['timeout'] = aiohttp.ClientTimeout(
+                total=self.request_kwargs['timeout'])
+        if 'headers' in self.request_kwargs:
+            kwargs['headers'] = self.request_kwargs['headers']
+        return kwargs
+
+    async def _fetch_all(self, urls, exception_handler):
+        """
+        Fetch pages with one aiohttp session
+        :return: list of responses
+        """
+        import aiohttp
+
+        async def fetch_one(session, url):
+            try:
+                async with session.get(url) as response:
+                    text = await response.text(errors='replace')
+                    return FetchResponse(str(response.url), response.status,
+                                         text)
+            except Exception as e:
+                self._handle_exception(exception_handler, url, e)
+                return None
+
+        responses = []
+        async with aiohttp.ClientSession(
+                **self._session_kwargs(aiohttp)) as session:
+            for task in asyncio.as_completed(
+                    [fetch_one(session, url) for url in urls]):
+                response = await task
+                if response is not None:
+                    responses.append(response)
+        return responses
+
+    def fetch(self, urls, exception_handler=None):
+        loop = asyncio.new_event_loop()
+        try:
+            responses = loop.run_until_complete(
+                self._fetch_all(urls, exception_handler))
+        finally:
+            loop.close()
+        for response in responses:
+            yield response
+
+
+BACKENDS = {backend.name: backend for backend in
+            (GeventBackend, ThreadPoolBackend, AsyncioBackend)}
+
+
+def get_fetch_backend(name, workers_num, **request_kwargs):
+    """
+    Create fetch backend by name
+    :param name: one of BACKENDS keys
+    :param workers_num: the maximum number of requests sent at one time
+    :param request_kwargs: keyword arguments of requests.get
+    :return: FetchBackend object
+    """
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError('Unknown fetch backend {}, expected one of {}'.format(
+            name, ', '.join(sorted(BACKENDS))))
+    logging.info('Use {} fetch backend'.format(name))
+    return backend(workers_num, **request_kwargs)
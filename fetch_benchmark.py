@@ -0,0 +1,170 @@
+"""
+Benchmark of fetch backends against a local stand-in of vacancy pages.
+
+Every backend runs in its own process, so gevent monkey-patching does not
+affect the other backends:
+
+    $ python fetch_benchmark.py
+    $ python fetch_benchmark.py --backends threads asyncio --concurrency 10 50
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+DEFAULT_BACKENDS = ['gevent', 'threads', 'asyncio']
+DEFAULT_CONCURRENCY = [10, 30, 100]
+# sizes of vacancy description in bytes
+DEFAULT_PAYLOADS = [1024, 16384, 131072]
+DEFAULT_REQUESTS = 300
+# seconds the stand-in server waits before response, imitates network
+DEFAULT_LATENCY = 0.05
+
+PAGE_TEMPLATE = '<html><body><div class="box-spacing-md">' \
+                '<div class="col-sm-8">{}</div></div></body></html>'
+
+
+def serve(latency):
+    """
+    Run stand-in server of vacancy pages on free port and print the port.
+    Description size is taken from `size` query parameter
+    :param latency: seconds before each response
+    """
+    # http.server imports ssl, so it is not imported in processes
+    # which are patched by gevent
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib import parse
+
+    class StandInServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+        request_queue_size = 256
+
+    class VacancyPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse.parse_qs(parse.urlparse(self.path).query)
+            size = int(query.get('size', ['1024'])[0])
+            body = PAGE_TEMPLATE.format('x' * size).encode('utf-8')
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = StandInServer(('127.0.0.1', 0), VacancyPageHandler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def run_case(backend_name, port, concurrency, payload, requests_num):
+    """
+    Fetch and parse vacancy pages with one backend and print result as json
+    """
+    if backend_name == 'gevent':
+        # patch the process before requests and ssl are imported
+        import grequests  # noqa: F401
+    from pyquery import PyQuery as pq
+    from fetch_backends import get_fetch_backend
+    from mcdonalds_parser import McDonaldsParser
+
+    urls = ['http://127.0.0.1:{}/stellenangebot/job-detail.html?'
+            'jobId=req{}&size={}'.format(port, i, payload)
+            for i in range(requests_num)]
+    backend = get_fetch_backend(backend_name, concurrency, timeout=60)
+    errors = []
+    parsed = 0
+    start = time.perf_counter()
+    for response in backend.fetch(
+            urls, exception_handler=lambda url, e: errors.append(url)):
+        if response.status_code == 200 and \
+                McDonaldsParser._get_vacancy_description(pq(response.text)):
+            parsed += 1
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        'backend': backend_name,
+        'concurrency': concurrency,
+        'payload': payload,
+        'requests': requests_num,
+        'parsed': parsed,
+        'errors': len(errors),
+        'seconds': round(seconds, 3),
+        'rps': round(requests_num / seconds, 1),
+    }))
+
+
+def run_benchmark(args):
+    """
+    Start stand-in server and run every case in a separate process
+    :param args: argparse namespace
+    :return: list of dicts with results
+    """
+    server = subprocess.Popen(
+        [sys.executable, __file__, '--serve', '--latency', str(args.latency)],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    results = []
+    try:
+        port = server.stdout.readline().strip()
+        for payload in args.payloads:
+            for concurrency in args.concurrency:
+                for backend in args.backends:
+                    output = subprocess.check_output(
+                        [sys.executable, __file__, '--run', backend,
+                         '--port', port,
+                         '--concurrency', str(concurrency),
+                         '--payloads', str(payload),
+                         '--requests', str(args.requests)],
+                        universal_newlines=True)
+                    result = json.loads(output.strip().splitlines()[-1])
+                    results.append(result)
+                    print('{backend:>8} concurrency={concurrency:<4} '
+                          'payload={payload:<7} {seconds:>8.3f}s '
+                          '{rps:>8.1f} req/s errors={errors}'.format(**result))
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    :return: argparse namespace
+    """
+    arg_parser = argparse.ArgumentParser(
+        description='Fetch backends benchmark')
+    arg_parser.add_argument('--backends', nargs='+', default=DEFAULT_BACKENDS)
+    arg_parser.add_argument('--concurrency', nargs='+', type=int,
+                            default=DEFAULT_CONCURRENCY)
+    arg_parser.add_argument('--payloads', nargs='+', type=int,
+                            default=DEFAULT_PAYLOADS,
+                            help='description sizes in bytes')
+    arg_parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                            help='requests per case')
+    arg_parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                            help='seconds before each response')
+    arg_parser.add_argument('--output', help='save results to json file')
+    # internal modes of child processes
+    arg_parser.add_argument('--serve', action='store_true',
+                            help=argparse.SUPPRESS)
+    arg_parser.add_argument('--run', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--port', help=argparse.SUPPRESS)
+    return arg_parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.serve:
+        serve(args.latency)
+    elif args.run:
+        run_case(args.run, args.port, args.concurrency[0], args.payloads[0],
+                 args.requests)
+    else:
+        results = run_benchmark(args)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
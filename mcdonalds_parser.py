@@ -1,8 +1,23 @@
 import os
 import sys
+import argparse
+
+# When the parser runs as a script with the gevent fetch backend (default),
+# grequests has to monkey-patch the process before requests and ssl are
+# imported. Importing this module from other code does not patch anything,
+# applications using gevent backend have to import grequests first.
+if __name__ == "__main__":
+    backend_arg_parser = argparse.ArgumentParser(add_help=False)
+    backend_arg_parser.add_argument('--fetch-backend', default='gevent')
+    if backend_arg_parser.parse_known_args()[0].fetch_backend == 'gevent':
+        import grequests  # noqa: F401
+
+import time
+import hashlib
+import socket
 import logging
+import subprocess
 
-import grequests as grq
 import requests as rq
 import urllib3
 
@@ -12,7 +27,10 @@ from lxml import etree
 from pyquery import PyQuery as pq
 from fake_useragent import UserAgent
 
+from fetch_backends import BACKENDS, get_fetch_backend
+from profiling import Profiler, dumps_profiles, profile_phase
 from utils import prepare_logs_dir
+from work_queue import WorkQueue
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -55,6 +73,8 @@ class McDonaldsParser:
     # the maximum number of attempts to obtain a response,
     # in case the server responded with an error
     ATTEMPTS_COUNT = 3
+    # Url of site with vacancy pages
+    SITE_URL = 'https://karriere.mcdonalds.de'
     # Base url to get vacancy
     BASE_VACANCY_URL = 'https://karriere.mcdonalds.de/stellenangebot/' \
                        'job-detail.html?jobId='
@@ -126,12 +146,40 @@ class McDonaldsParser:
 
     UA_SUFFIX = 'JobUFO GmbH'
 
-    def __init__(self):
+    # seconds to wait for server response
+    REQUEST_TIMEOUT = 60
+
+    # Default path of queue file for coordinator/worker mode
+    DEFAULT_QUEUE_PATH = os.path.join(CURRENT_DIR, 'queue', 'crawl.sqlite')
+    # Kinds of work units
+    SEARCH_UNIT = 'search'
+    DESCRIPTION_UNIT = 'description'
+    # seconds between queue checks
+    POLL_INTERVAL = 5
+
+    def __init__(self, shared_descriptions=False, fetch_backend='gevent',
+                 profile_dir=None):
         """
         Init class
+        :param shared_descriptions: export each unique description once and
+                                    reference it from vacancies by hash
+        :param fetch_backend: name of backend to fetch vacancy pages,
+                              one of fetch_backends.BACKENDS
+        :param profile_dir: directory to save profiles of crawl phases,
+                            profiling is off if None
         """
+        self.profiler = Profiler(profile_dir) if profile_dir else None
+        self.fetch_backend = get_fetch_backend(
+            fetch_backend, self.WORKERS_NUM, timeout=self.REQUEST_TIMEOUT,
+            verify=False)
         self.user_agent = UserAgent()
         self.vacancy_dict = {}
+        # unique descriptions by content hash
+        self.descriptions = {}
+        self.shared_descriptions = shared_descriptions
+        # function called after each batch of requests, e.g. to renew lease
+        # of work unit
+        self.batch_callback = None
 
     @property
     def _request_settings(self):
@@ -140,7 +188,7 @@ class McDonaldsParser:
         :return: dict with settings
         """
         return {
-            'timeout': 60,
+            'timeout': self.REQUEST_TIMEOUT,
             'headers': {'User-Agent': '{} {}'.format(self.user_agent.random,
                                                      self.UA_SUFFIX)},
             'verify': False,
@@ -177,82 +225,81 @@ class McDonaldsParser:
                     "location_name": location_name,
                     "location_city": location_city,
                     "location_address": location_address,
-                    "vacancy_url": 'https://karriere.mcdonalds.de' + job[
-                        "applicationUrl"],
+                    "vacancy_url": self.SITE_URL + job["applicationUrl"],
                     "vacancy_label": job["label"],
                     "start_date": self._get_start_date(job["startDate"]),
-                    "description": ""
+                    "description": "",
+                    "description_hash": ""
                 }
         logging.info("Vacancies count: {}".format(len(self.vacancy_dict)))
 
+    def _get_search_params(self):
+        """
+        Creates list of request params from DEFAULT lists above
+        :return: list of dicts with request params
+        """
+        params = []
+        # params for ordinary vacancies
+        for city in self.DEFAULT_LOCATIONS_REST:
+            for rest_type in self.DEFAULT_TYPES_REST:
+                params.append(dict(city, pos=rest_type))
+        # params for administrative vacancies
+        for adm_type in self.DEFAULT_TYPES_ADM:
+            params.append(dict(self.DEFAULT_LOCATION_ADM, pos=adm_type))
+        return params
+
+    def _search_vacancies(self, params):
+        """
+        Do request to api url with given params, and parse received data
+        to vacancy dict
+        :param params: dict with request params
+        :return: True if response was received and parsed
+        """
+        attempt = 1
+        logging.info('Do request for vacancies in {}'.format(params))
+        # Do request on api url
+        res = rq.post(self.DEFAULT_URL, data=params, **self._request_settings)
+        # Trying to get response without error, if first was with
+        while res.status_code != 200 and attempt <= self.ATTEMPTS_COUNT:
+            res = rq.post(self.DEFAULT_URL, data=params,
+                          **self._request_settings)
+            logging.info('Retry to receive from {}'.format(params))
+            attempt += 1
+        if res.status_code != 200:
+            logging.info('Can not receive vacancies \nurl:{} code:{}'.format(
+                res.url, res.status_code))
+            return False
+        try:
+            # check the response format
+            result = res.json()
+            # Fetching vacancy data from json response
+            self._parse_json(result)
+        except Exception as e:
+            logging.info(
+                'Can not parse json \nurl:{} code:{} error{}'.format(
+                    res.url, res.status_code, str(e)))
+            return False
+        return True
+
     def _do_requests(self):
         """
         Do requests to api url with params from DEFAULT lists above, and
         parse received data to vacancy dict
         """
+        search_params = self._get_search_params()
         # Prepare params for progress bar
-        total = len(self.DEFAULT_LOCATIONS_REST) * len(
-            self.DEFAULT_TYPES_REST) + len(self.DEFAULT_TYPES_ADM)
-        i = 0
-
-        # receive ordinary vacancies
-        for city in self.DEFAULT_LOCATIONS_REST:
-            for rest_type in self.DEFAULT_TYPES_REST:
-                progress(i, total, status='Parse vacancies')
-                i += 1
-                attempt = 1
-                # Prepare request params
-                city.update({'pos': rest_type})
-                logging.info('Do request for vacancies in {}'.format(city))
-                # Do request on api url
-                res = rq.post(self.DEFAULT_URL, data=city,
-                              **self._request_settings)
-                # Trying to get response without error, if first was with
-                while res.status_code != 200 and \
-                                attempt <= self.ATTEMPTS_COUNT:
-                    res = rq.post(self.DEFAULT_URL, data=city,
-                                  **self._request_settings)
-                    logging.info('Retry to receive from {}'.format(city))
-                try:
-                    # check the response format
-                    result = res.json()
-                    # Fetching vacancy data from json response
-                    self._parse_json(result)
-                except Exception as e:
-                    logging.info(
-                        'Can not parse json \nurl:{} code:{} error{}'.format(
-                            res.url, res.status_code, str(e)))
-
-        # receive administrative vacancies in the same way as ordinary
-        for adm_type in self.DEFAULT_TYPES_ADM:
+        total = len(search_params)
+        for i, params in enumerate(search_params):
             progress(i, total, status='Parse vacancies')
-            i += 1
-            attempt = 1
-            logging.info(
-                'Do request to receive administrative vacancies {}'.format(
-                    self.DEFAULT_LOCATION_ADM))
-            self.DEFAULT_LOCATION_ADM.update({'pos': adm_type})
-            res = rq.post(self.DEFAULT_URL, data=self.DEFAULT_LOCATION_ADM,
-                          **self._request_settings)
-            while res.status_code != 200 and attempt <= self.ATTEMPTS_COUNT:
-                res = rq.post(self.DEFAULT_URL, data=self.DEFAULT_LOCATION_ADM,
-                              **self._request_settings)
-                logging.info('Retry to receive from administrative vacancies')
-            try:
-                result = res.json()
-                self._parse_json(result)
-            except Exception as e:
-                logging.info(
-                    'Can not parse json \nurl:{} code:{} error{}'.format(
-                        res.url, res.status_code, str(e)))
+            self._search_vacancies(params)
 
     @staticmethod
-    def exception_handler(request, exception):
+    def exception_handler(url, exception):
         """
         Exception handler for request
         """
         logging.info(
-            "Request failed. \nurl:{} error:{}".format(request.url, exception))
+            "Request failed. \nurl:{} error:{}".format(url, exception))
 
     @staticmethod
     def _get_vacancy_description(response):
@@ -266,20 +313,20 @@ class McDonaldsParser:
 
     def _get_description(self, rs):
         """
-        Creates asynchronous requests using the grequests library,
+        Creates concurrent requests using the fetch backend,
         if request was successful - gets vacancy description from vacancy page,
         if not - appends url in list of urls, which will be used again
         :param rs: list of urls
         :return: list of urls with error in response
         """
         error_rs = []
-        for r in grq.imap(rs, size=self.WORKERS_NUM,
-                          exception_handler=self.exception_handler):
+        for r in self.fetch_backend.fetch(
+                rs, exception_handler=self.exception_handler):
             if r.status_code == 200:
                 try:
                     index = self._get_job_id(r.url)
-                    self.vacancy_dict[index]["description"] = \
-                        self._get_vacancy_description(pq(r.text))
+                    self._set_description(
+                        index, self._get_vacancy_description(pq(r.text)))
                     if self.vacancy_dict[index]["description"] == "":
                         error_rs.append(r.url)
                         logging.info('Empty description in {}'.format(index))
@@ -291,6 +338,57 @@ class McDonaldsParser:
                 error_rs.append(r.url)
         return error_rs
 
+    def _set_description(self, job_id, description):
+        """
+        Stores vacancy description. Descriptions with the same content
+        share one stored copy, which is found by content hash
+        :param job_id: Job ID
+        :param description: text content
+        """
+        vacancy = self.vacancy_dict[job_id]
+        if not description:
+            vacancy["description"] = ""
+            vacancy["description_hash"] = ""
+            return
+        description_hash = hashlib.sha1(
+            description.encode('utf-8')).hexdigest()
+        self._set_shared_description(job_id, description_hash, description)
+
+    def _set_shared_description(self, job_id, description_hash, description):
+        """
+        Stores vacancy description with known content hash
+        :param job_id: Job ID
+        :param description_hash: content hash of description
+        :param description: text content
+        """
+        vacancy = self.vacancy_dict[job_id]
+        vacancy["description"] = self.descriptions.setdefault(
+            description_hash, description)
+        vacancy["description_hash"] = description_hash
+
+    @property
+    def description_stats(self):
+        """
+        Statistics of descriptions deduplication
+        :return: dict with number of descriptions, number of unique
+                 descriptions and dedup ratio
+        """
+        total = len([vacancy for vacancy in self.vacancy_dict.values()
+                     if vacancy["description_hash"]])
+        unique = len(self._get_used_hashes())
+        return {
+            'total': total,
+            'unique': unique,
+            'ratio': round(total / unique, 2) if unique else 0.0
+        }
+
+    def _log_description_stats(self):
+        """
+        Log statistics of descriptions deduplication
+        """
+        logging.info("Descriptions count: {total}, unique: {unique}, "
+                     "dedup ratio: {ratio}".format(**self.description_stats))
+
     def _get_url_list(self):
         """
         Creates list of urls from vacancies list
@@ -309,7 +407,7 @@ class McDonaldsParser:
         :param url_list: list of urls
         :return: list of urls which need to be requested again
         """
-        # list of requests
+        # list of urls to request in current batch
         rs = []
         # list of urls which need to be requested again
         error_rs = []
@@ -320,18 +418,27 @@ class McDonaldsParser:
         for url in url_list:
             progress(i, total, status='Getting vacancy descriptions')
             i += 1
-            rs.append(grq.get(url))
+            rs.append(url)
             # count the number of queries
             counter += 1
             if counter == self.MAX_ID:
                 # execute request and prepare variables for new batch,
                 # also extend list urls which will used again
                 error_rs.extend(self._get_description(rs))
+                self._batch_done()
                 counter = 0
                 rs = []
         error_rs.extend(self._get_description(rs))
+        self._batch_done()
         return error_rs
 
+    def _batch_done(self):
+        """
+        Call batch callback if it is set
+        """
+        if self.batch_callback is not None:
+            self.batch_callback()
+
     @staticmethod
     def _get_job_id(link):
         """
@@ -346,6 +453,14 @@ class McDonaldsParser:
                 'Can not get identifier from url {} {}'.format(link, str(e)))
             return ""
 
+    def _get_used_hashes(self):
+        """
+        :return: set of hashes of descriptions used by vacancies
+        """
+        return {vacancy["description_hash"]
+                for vacancy in self.vacancy_dict.values()
+                if vacancy["description_hash"]}
+
     def _export_to_xml(self):
         """
         Export vacancies to xml file
@@ -372,8 +487,14 @@ class McDonaldsParser:
             except Exception as e:
                 logging.info("Can't get kind of vacancy  {}".format(str(e)))
                 etree.SubElement(vacancy, 'kind')
-            etree.SubElement(vacancy, 'description').text = \
-                etree.CDATA(data["description"])
+            if self.shared_descriptions:
+                # description text is written once in descriptions section
+                description = etree.SubElement(vacancy, 'description')
+                if data["description_hash"]:
+                    description.set('ref', data["description_hash"])
+            else:
+                etree.SubElement(vacancy, 'description').text = \
+                    etree.CDATA(data["description"])
             etree.SubElement(vacancy, 'top_location').text = data[
                 "location_city"]
             locations = etree.SubElement(vacancy, 'locations')
@@ -391,6 +512,13 @@ class McDonaldsParser:
             etree.SubElement(vacancy, 'contact_email').text = \
                 'fallback@jobufo.com'
 
+        if self.shared_descriptions:
+            descriptions = etree.SubElement(root, 'descriptions')
+            for description_hash in sorted(self._get_used_hashes()):
+                etree.SubElement(descriptions, 'description',
+                                 hash=description_hash).text = \
+                    etree.CDATA(self.descriptions[description_hash])
+
         # create directory to save parsed xml if it does not exists
         if not os.path.exists(self.DIR_TO_EXPORT):
             os.makedirs(self.DIR_TO_EXPORT)
@@ -402,17 +530,15 @@ class McDonaldsParser:
                    encoding='utf-8')
         return filepath
 
-    def run(self):
+    def _fetch_descriptions(self, url_list):
         """
-        Run process of applying job
+        Obtains vacancies descriptions, urls with error are requested again
+        up to ATTEMPTS_COUNT times
+        :param url_list: list of urls
+        :return: list of urls which were not reached
         """
-        # obtaining a dict of vacancies
-        self._do_requests()
-        # obtaining a list of vacancies urls
-        main_url_list = self._get_url_list()
-        logging.info("Main urls count : {}".format(len(main_url_list)))
         # obtaining vacancies descriptions and list of urls to parse again
-        error_url_list = self._prepare_data(main_url_list)
+        error_url_list = self._prepare_data(url_list)
         logging.info("Error urls count : {}".format(len(error_url_list)))
         attempt = 1
         # trying to get responses from all urls
@@ -420,10 +546,255 @@ class McDonaldsParser:
             logging.info("Attempt to reach error urls: {}".format(attempt))
             error_url_list = self._prepare_data(error_url_list)
             attempt += 1
+        return error_url_list
+
+    @dumps_profiles
+    def run(self):
+        """
+        Run process of parsing vacancies
+        """
+        # obtaining a dict of vacancies
+        with profile_phase(self.profiler, 'search'):
+            self._do_requests()
+        # obtaining a list of vacancies urls
+        main_url_list = self._get_url_list()
+        logging.info("Main urls count : {}".format(len(main_url_list)))
+        with profile_phase(self.profiler, 'descriptions'):
+            self._fetch_descriptions(main_url_list)
+        self._log_description_stats()
         # export vacancies into xml file
-        self._export_to_xml()
+        with profile_phase(self.profiler, 'export'):
+            self._export_to_xml()
+
+    def _start_workers(self, queue_path, workers_num):
+        """
+        Start local worker processes
+        :param queue_path: path to queue file
+        :param workers_num: number of processes
+        :return: list of processes
+        """
+        command = [sys.executable, os.path.realpath(__file__),
+                   '--worker', '--queue', queue_path,
+                   '--fetch-backend', self.fetch_backend.name]
+        if self.profiler:
+            command.extend(['--profile', self.profiler.output_dir])
+        return [subprocess.Popen(command) for _ in range(workers_num)]
+
+    def _wait_for_units(self, queue, kind, processes):
+        """
+        Wait until all units of given kind are done or failed
+        :param queue: WorkQueue object
+        :param kind: kind of units
+        :param processes: list of local worker processes
+        """
+        total = queue.unfinished_count(kind)
+        unfinished = total
+        while unfinished > 0:
+            progress(total - unfinished, total,
+                     status='Waiting for workers ({})'.format(kind))
+            # nobody is left to process units if all local workers exited
+            # and no other worker holds a lease
+            if processes and \
+                    all(process.poll() is not None for process in processes) \
+                    and queue.live_leases_count() == 0:
+                raise RuntimeError(
+                    'All local workers exited with {} unfinished units '
+                    'of kind {}'.format(unfinished, kind))
+            time.sleep(self.POLL_INTERVAL)
+            unfinished = queue.unfinished_count(kind)
+        failed = queue.failed_count(kind)
+        if failed:
+            logging.warning('Failed units of kind {}: {}, results are '
+                            'incomplete'.format(kind, failed))
+
+    def _get_description_units(self):
+        """
+        Splits vacancies urls into units of MAX_ID urls
+        :return: list of dicts job id: vacancy url
+        """
+        units = []
+        unit = {}
+        for job_id, vacancy in self.vacancy_dict.items():
+            unit[job_id] = vacancy["vacancy_url"]
+            if len(unit) == self.MAX_ID:
+                units.append(unit)
+                unit = {}
+        if unit:
+            units.append(unit)
+        return units
+
+    @dumps_profiles
+    def run_coordinator(self, queue_path, workers_num=0):
+        """
+        Split search grid and descriptions urls into work units, wait until
+        workers process them and export merged results.
+        Workers on other hosts can be started with
+        `python mcdonalds_parser.py --worker --queue <queue_path>`
+        :param queue_path: path to queue file, shared with workers
+        :param workers_num: number of local worker processes to start
+        :return: xml file path
+        """
+        queue = WorkQueue(queue_path, max_attempts=self.ATTEMPTS_COUNT)
+        queue.reset()
+        queue.put(self.SEARCH_UNIT, self._get_search_params())
+        processes = self._start_workers(queue_path, workers_num)
+
+        # merge vacancies found by workers
+        self._wait_for_units(queue, self.SEARCH_UNIT, processes)
+        with profile_phase(self.profiler, 'merge'):
+            for result in queue.results(self.SEARCH_UNIT):
+                self.vacancy_dict.update(result)
+        logging.info("Vacancies count: {}".format(len(self.vacancy_dict)))
+
+        queue.put(self.DESCRIPTION_UNIT, self._get_description_units())
+        queue.close_queue()
+
+        # merge descriptions fetched by workers
+        self._wait_for_units(queue, self.DESCRIPTION_UNIT, processes)
+        with profile_phase(self.profiler, 'merge'):
+            for result in queue.results(self.DESCRIPTION_UNIT):
+                for job_id, description_hash in result['jobs'].items():
+                    self._set_shared_description(
+                        job_id, description_hash,
+                        result['descriptions'][description_hash])
+        missing = len([vacancy for vacancy in self.vacancy_dict.values()
+                       if not vacancy["description_hash"]])
+        if missing:
+            logging.info('Vacancies without description: {}'.format(missing))
+        self._log_description_stats()
+
+        for process in processes:
+            process.wait()
+        queue.close()
+        with profile_phase(self.profiler, 'export'):
+            return self._export_to_xml()
+
+    def _process_unit(self, kind, payload):
+        """
+        Process one work unit. Raises RuntimeError if search response was
+        not received or some descriptions were not fetched, so the unit is
+        tried again
+        :param kind: kind of unit
+        :param payload: search params or dict job id: vacancy url
+        :return: json serializable result of unit, for description unit
+                 dict with unique descriptions by hash and hashes by job id
+        """
+        if kind == self.SEARCH_UNIT:
+            self.vacancy_dict = {}
+            with profile_phase(self.profiler, 'search'):
+                found = self._search_vacancies(payload)
+            if not found:
+                raise RuntimeError('Search failed for {}'.format(payload))
+            return self.vacancy_dict
+        self.vacancy_dict = {
+            job_id: {"vacancy_url": url, "description": "",
+                     "description_hash": ""}
+            for job_id, url in payload.items()
+        }
+        self.descriptions = {}
+        with profile_phase(self.profiler, 'descriptions'):
+            self._fetch_descriptions(list(payload.values()))
+        missing = [job_id for job_id, vacancy in self.vacancy_dict.items()
+                   if not vacancy["description_hash"]]
+        if missing:
+            raise RuntimeError('Descriptions were not fetched for {}'.format(
+                ', '.join(missing)))
+        # each unique text is stored once in unit result
+        return {
+            'descriptions': self.descriptions,
+            'jobs': {job_id: vacancy["description_hash"]
+                     for job_id, vacancy in self.vacancy_dict.items()}
+        }
+
+    @dumps_profiles
+    def run_worker(self, queue_path):
+        """
+        Claim and process work units until coordinator closes the queue
+        and all units are done. Worker can be started before coordinator,
+        if the queue holds a finished run of previous coordinator, worker
+        waits for the next run
+        :param queue_path: path to queue file, shared with coordinator
+        """
+        queue = WorkQueue(queue_path, max_attempts=self.ATTEMPTS_COUNT)
+        worker_id = '{}:{}'.format(socket.gethostname(), os.getpid())
+        if self.profiler:
+            # workers share profile directory, each one writes to its own
+            self.profiler.output_dir = os.path.join(
+                self.profiler.output_dir,
+                'worker-{}-{}'.format(socket.gethostname(), os.getpid()))
+        logging.info('Start worker {}'.format(worker_id))
+        # run finished before the worker started
+        stale_run = queue.is_finished
+        stale_run_id = queue.run_id
+        while True:
+            unit = queue.claim(worker_id)
+            if unit is None:
+                if queue.is_finished and not (
+                        stale_run and queue.run_id == stale_run_id):
+                    break
+                time.sleep(self.POLL_INTERVAL)
+                continue
+            unit_id, kind, payload = unit
+            # keep the lease while requests of the unit are sent
+            self.batch_callback = lambda: queue.renew(unit_id, worker_id)
+            try:
+                result = self._process_unit(kind, payload)
+            except Exception as e:
+                logging.info('Can not process unit {} {}'.format(unit_id,
+                                                                 str(e)))
+                if queue.release(unit_id, worker_id):
+                    # give the site time to recover before next attempt
+                    time.sleep(self.POLL_INTERVAL)
+                else:
+                    logging.info('Unit {} failed after {} attempts'.format(
+                        unit_id, self.ATTEMPTS_COUNT))
+                continue
+            finally:
+                self.batch_callback = None
+            if not queue.complete(unit_id, worker_id, result):
+                logging.info('Lease of unit {} was lost'.format(unit_id))
+        queue.close()
+        logging.info('Stop worker {}'.format(worker_id))
+
+
+def parse_args():
+    """
+    Parse command line arguments
+    :return: argparse namespace
+    """
+    arg_parser = argparse.ArgumentParser(description="McDonald's parser")
+    mode = arg_parser.add_mutually_exclusive_group()
+    mode.add_argument('--coordinator', action='store_true',
+                      help='split crawl into units for worker processes')
+    mode.add_argument('--worker', action='store_true',
+                      help='process units from queue')
+    arg_parser.add_argument('--queue',
+                            default=McDonaldsParser.DEFAULT_QUEUE_PATH,
+                            help='path to queue file shared between '
+                                 'coordinator and workers')
+    arg_parser.add_argument('--workers', type=int, default=0,
+                            help='number of local worker processes started '
+                                 'by coordinator')
+    arg_parser.add_argument('--shared-descriptions', action='store_true',
+                            help='export each unique description once and '
+                                 'reference it from vacancies by hash')
+    arg_parser.add_argument('--fetch-backend', choices=sorted(BACKENDS),
+                            default='gevent',
+                            help='backend to fetch vacancy pages')
+    arg_parser.add_argument('--profile', metavar='DIR',
+                            help='save profiles of crawl phases to '
+                                 'directory')
+    return arg_parser.parse_args()
 
 
 if __name__ == "__main__":
-    parser = McDonaldsParser()
-    parser.run()
+    args = parse_args()
+    parser = McDonaldsParser(shared_descriptions=args.shared_descriptions,
+                             fetch_backend=args.fetch_backend,
+                             profile_dir=args.profile)
+    if args.coordinator:
+        parser.run_coordinator(args.queue, args.workers)
+    elif args.worker:
+        parser.run_worker(args.queue)
+    else:
+        parser.run()
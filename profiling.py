@@ -0,0 +1,193 @@
+import os
+import sys
+import functools
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+
+from collections import Counter
+from contextlib import contextmanager
+
+
+@contextmanager
+def _no_profiling():
+    yield
+
+
+def profile_phase(profiler, name):
+    """
+    Context manager to profile a phase of crawl
+    :param profiler: Profiler object or None if profiling is off
+    :param name: phase name
+    :return: context manager
+    """
+    if profiler is None:
+        return _no_profiling()
+    return profiler.phase(name)
+
+
+def dumps_profiles(method):
+    """
+    Decorator of entry point methods of objects with `profiler` attribute,
+    profiles are written when the method returns or fails
+    :param method: entry point method
+    :return: wrapped method
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.profiler is not None:
+                self.profiler.dump()
+    return wrapper
+
+
+class StackSampler(threading.Thread):
+    """
+    Thread which periodically records stacks of all other threads.
+    Stacks are counted in collapsed format used by flame graph tools.
+    Under gevent the stack of the main thread is the stack of the running
+    greenlet, time spent in the scheduler is shown under gevent hub frames
+    """
+
+    def __init__(self, interval):
+        """
+        Init class
+        :param interval: seconds between samples
+        """
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return '{}:{}:{}'.format(os.path.basename(code.co_filename),
+                                 code.co_name, frame.f_lineno)
+
+    def _sample(self):
+        """
+        Record stacks of all threads except sampler
+        """
+        names = {thread.ident: thread.name
+                 for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+
+    def stop(self):
+        """
+        Stop sampling and wait for thread
+        """
+        self._stop_event.set()
+        self.join()
+
+
+class Profiler:
+    """
+    Opt-in profiler of crawl phases. Repeated phases with the same name
+    are accumulated and written to output directory by dump():
+    - <phase>.prof - cProfile stats, can be opened with pstats or snakeviz
+    - <phase>.txt - cProfile stats sorted by cumulative time
+    - <phase>.collapsed - sampled stacks for flamegraph.pl or speedscope
+    Allocations are written at the end of each call of phase, numbered
+    from 1:
+    - <phase>-<n>.alloc.txt - top memory allocation sites by tracemalloc
+    - <phase>-<n>.alloc.snapshot - tracemalloc snapshot
+    """
+    # seconds between stack samples
+    SAMPLE_INTERVAL = 0.005
+    # number of frames stored by tracemalloc for each allocation,
+    # each extra frame slows down every allocation in deep stacks
+    TRACEMALLOC_FRAMES = 1
+    # number of allocation sites written to report
+    TOP_ALLOCATIONS = 30
+    # number of functions written to text report
+    TOP_FUNCTIONS = 50
+
+    def __init__(self, output_dir, memory=True):
+        """
+        Init class
+        :param output_dir: directory to save profiles
+        :param memory: record allocation snapshots with tracemalloc
+        """
+        self.output_dir = output_dir
+        self.memory = memory
+        self.profiles = {}
+        self.stacks = {}
+        # number of calls of each phase
+        self.calls = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Profile code inside context as phase with given name
+        :param name: phase name
+        """
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        self.calls[name] += 1
+        sampler = StackSampler(self.SAMPLE_INTERVAL)
+        started_tracemalloc = False
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEMALLOC_FRAMES)
+            started_tracemalloc = True
+        sampler.start()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            sampler.stop()
+            self.stacks.setdefault(name, Counter()).update(sampler.stacks)
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+                self._dump_allocations(
+                    '{}-{}'.format(name, self.calls[name]), snapshot)
+
+    def _path(self, filename):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        return os.path.join(self.output_dir, filename)
+
+    def _dump_allocations(self, name, snapshot):
+        """
+        Write allocations of one call of phase
+        :param name: phase name with call number
+        :param snapshot: tracemalloc snapshot
+        """
+        snapshot.dump(self._path(name + '.alloc.snapshot'))
+        with open(self._path(name + '.alloc.txt'), 'w') as f:
+            for stat in snapshot.statistics('lineno')[:self.TOP_ALLOCATIONS]:
+                f.write('{}\n'.format(stat))
+
+    def dump(self):
+        """
+        Write accumulated profiles of all phases
+        """
+        for name, profile in self.profiles.items():
+            profile.dump_stats(self._path(name + '.prof'))
+            with open(self._path(name + '.txt'), 'w') as f:
+                stats = pstats.Stats(profile, stream=f)
+                stats.sort_stats('cumulative').print_stats(self.TOP_FUNCTIONS)
+
+            with open(self._path(name + '.collapsed'), 'w') as f:
+                for stack, count in sorted(self.stacks[name].items()):
+                    f.write('{} {}\n'.format(stack, count))
+        logging.info('Profiles of phases {} saved to {}'.format(
+            ', '.join(sorted(self.profiles)), self.output_dir))
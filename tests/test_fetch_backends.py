@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+import unittest
+import subprocess
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.append('..')
+
+from fetch_backends import FetchBackend, get_fetch_backend
+
+CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+
+# runs gevent backend test in a process patched by gevent before
+# other imports, so patching does not affect this process
+GEVENT_TEST_COMMAND = \
+    'import grequests, unittest; unittest.main(' \
+    'module="test_fetch_backends", ' \
+    'argv=["test", "FetchBackendsTestCase.check_gevent_backend"])'
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """
+    Responds with path of request, or 404 for /missing
+    """
+
+    def do_GET(self):
+        body = self.path.encode('utf-8')
+        self.send_response(404 if self.path == '/missing' else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FetchBackendsTestCase(unittest.TestCase):
+    """
+    Fetch backends tests
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), PageHandler)
+        cls.base_url = 'http://127.0.0.1:{}'.format(cls.server.server_port)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def check_backend(self, name):
+        """
+        Fetch pages with backend and check responses and failed requests
+        """
+        urls = [self.base_url + '/page{}'.format(i) for i in range(5)]
+        urls.append(self.base_url + '/missing')
+        # nothing listens on port 1
+        urls.append('http://127.0.0.1:1/refused')
+        errors = []
+        backend = get_fetch_backend(name, 3, timeout=10)
+        responses = list(backend.fetch(
+            urls, exception_handler=lambda url, e: errors.append(url)))
+        self.assertEqual(sorted(r.url for r in responses), sorted(urls[:-1]))
+        for r in responses:
+            self.assertEqual(r.status_code,
+                             404 if r.url.endswith('/missing') else 200)
+            self.assertTrue(r.url.endswith(r.text))
+        self.assertEqual(errors, ['http://127.0.0.1:1/refused'])
+
+    def test_thread_pool_backend(self):
+        """
+        Test 'threads' backend
+        :return:
+        """
+        self.check_backend('threads')
+
+    def test_asyncio_backend(self):
+        """
+        Test 'asyncio' backend
+        :return:
+        """
+        self.check_backend('asyncio')
+
+    def check_gevent_backend(self):
+        """
+        Check 'gevent' backend, runs only in patched process
+        :return:
+        """
+        self.check_backend('gevent')
+
+    def test_gevent_backend(self):
+        """
+        Test 'gevent' backend in separate process
+        :return:
+        """
+        result = subprocess.run([sys.executable, '-c', GEVENT_TEST_COMMAND],
+                                cwd=CURRENT_DIR, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertNotIn('MonkeyPatchWarning', result.stdout)
+
+    def test_gevent_backend_late_patching(self):
+        """
+        Test 'gevent' backend refuses process which was not patched
+        :return:
+        """
+        from gevent import monkey
+        if monkey.is_module_patched('ssl'):
+            self.skipTest('process is patched by gevent')
+        with self.assertRaises(RuntimeError):
+            get_fetch_backend('gevent', 3)
+
+    def test_backend_without_fetch(self):
+        """
+        Test backend must implement fetch
+        :return:
+        """
+        class IncompleteBackend(FetchBackend):
+            name = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            IncompleteBackend(3)
+
+    def test_unknown_backend(self):
+        """
+        Test error for unknown backend name
+        :return:
+        """
+        with self.assertRaises(ValueError):
+            get_fetch_backend('twisted', 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,14 @@
 import os
 import sys
 import json
+import shutil
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from unittest import mock
+from lxml import etree
 from pyquery import PyQuery as pq
 
 sys.path.append('..')
@@ -22,6 +29,52 @@ VACANCY_PAGE_FILEPATH = os.path.join(TEST_DATA_DIR, VACANCY_PAGE_FILENAME)
 
 prepare_logs_dir(LOGS_PATH)
 
+# descriptions of vacancy pages served to coordinator test
+COORDINATOR_DESCRIPTIONS = {
+    'req1': 'Same description',
+    'req2': 'Same description',
+    'req3': 'Other description',
+}
+
+COORDINATOR_SEARCH_JSON = [{
+    'locationName': 'Restaurant',
+    'locationAddress': {'municipality': 'Berlin',
+                        'addressLine': 'Hauptstr. 1'},
+    'locationJobs': [{
+        'jobId': job_id,
+        'applicationUrl': '/stellenangebot/job-detail.html?jobId=' + job_id,
+        'label': 'Crew (Vollzeit)',
+        'startDate': None,
+    } for job_id in sorted(COORDINATOR_DESCRIPTIONS)]
+}]
+
+
+class VacancyPageServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server handling each connection in a thread
+    """
+    daemon_threads = True
+
+
+class VacancyPageHandler(BaseHTTPRequestHandler):
+    """
+    Responds with vacancy page with description of jobId
+    """
+
+    def do_GET(self):
+        job_id = self.path.rsplit('=', 1)[1]
+        body = '<div class="box-spacing-md"><div class="col-sm-8">{}' \
+               '</div></div>'.format(COORDINATOR_DESCRIPTIONS[job_id])
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
 
 def get_test_data():
     """
@@ -44,7 +97,7 @@ class ParserTestCase(unittest.TestCase):
         from mcdonalds_parser import McDonaldsParser
         # get test data from file
         self.test_data = get_test_data()
-        self.parser = McDonaldsParser()
+        self.parser = McDonaldsParser(fetch_backend='threads')
 
     def test_parse_json(self):
         """
@@ -73,6 +126,262 @@ class ParserTestCase(unittest.TestCase):
         self.assertIsNotNone(description)
         self.assertNotEqual(description, "")
 
+    def test_search_params(self):
+        """
+        Test search grid covers all locations and types
+        :return:
+        """
+        params = self.parser._get_search_params()
+        total = len(self.parser.DEFAULT_LOCATIONS_REST) * len(
+            self.parser.DEFAULT_TYPES_REST) + len(
+            self.parser.DEFAULT_TYPES_ADM)
+        self.assertEqual(len(params), total)
+        self.assertEqual(params[-1]['pos'], 'INT_VW_PRWS')
+        self.assertNotIn('pos', self.parser.DEFAULT_LOCATION_ADM)
+
+    def test_description_units(self):
+        """
+        Test splitting vacancies urls into work units
+        :return:
+        """
+        self.parser._parse_json(self.test_data)
+        units = self.parser._get_description_units()
+        self.assertEqual(len(units), 13)
+        self.assertEqual(sum(len(unit) for unit in units), 1223)
+        self.assertTrue(all(len(unit) <= self.parser.MAX_ID
+                            for unit in units))
+
+    def test_description_dedup(self):
+        """
+        Test equal descriptions are stored once
+        :return:
+        """
+        self.parser._parse_json(self.test_data)
+        self.parser._set_description('req1655', ''.join(['same', ' text']))
+        self.parser._set_description('req7297', ''.join(['same', ' text']))
+        self.parser._set_description('req3780', 'other text')
+        self.assertIs(self.parser.vacancy_dict['req1655']['description'],
+                      self.parser.vacancy_dict['req7297']['description'])
+        self.assertEqual(len(self.parser.descriptions), 2)
+        self.assertEqual(self.parser.description_stats,
+                         {'total': 3, 'unique': 2, 'ratio': 1.5})
+
+    def test_export_shared_descriptions(self):
+        """
+        Test export with descriptions referenced by hash
+        :return:
+        """
+        self.parser._parse_json(self.test_data)
+        self.parser._set_description('req1655', 'same text')
+        self.parser._set_description('req7297', 'same text')
+        self.parser.shared_descriptions = True
+        self.parser.DIR_TO_EXPORT = tempfile.mkdtemp()
+        try:
+            root = etree.parse(self.parser._export_to_xml()).getroot()
+        finally:
+            shutil.rmtree(self.parser.DIR_TO_EXPORT)
+        shared = root.findall('descriptions/description')
+        self.assertEqual(len(shared), 1)
+        self.assertEqual(shared[0].text, 'same text')
+        refs = [description.get('ref')
+                for description in root.findall('position/description')]
+        self.assertEqual(refs.count(shared[0].get('hash')), 2)
+
+    def test_description_unit_result(self):
+        """
+        Test description unit result stores each unique text once
+        :return:
+        """
+        from fetch_backends import FetchResponse
+        with open(VACANCY_PAGE_FILEPATH) as f:
+            page = f.read()
+        payload = {
+            job_id: self.parser.BASE_VACANCY_URL + job_id
+            for job_id in ('req1655', 'req7297')
+        }
+        responses = [FetchResponse(url, 200, page)
+                     for url in payload.values()]
+        with mock.patch.object(self.parser.fetch_backend, 'fetch',
+                               return_value=responses):
+            result = self.parser._process_unit(
+                self.parser.DESCRIPTION_UNIT, payload)
+        self.assertEqual(len(result['descriptions']), 1)
+        description_hash = list(result['descriptions'])[0]
+        self.assertEqual(result['jobs'], {'req1655': description_hash,
+                                          'req7297': description_hash})
+
+    def test_worker_failing_unit(self):
+        """
+        Test worker gives up on unit which always fails
+        :return:
+        """
+        from work_queue import WorkQueue
+        queue_dir = tempfile.mkdtemp()
+        queue_path = os.path.join(queue_dir, 'queue.sqlite')
+        queue = WorkQueue(queue_path)
+        queue.put(self.parser.SEARCH_UNIT, [{'pos': 'MINIJOB'}])
+        queue.close_queue()
+        self.parser.POLL_INTERVAL = 0
+        try:
+            with mock.patch('mcdonalds_parser.rq.post',
+                            side_effect=ConnectionError) as post:
+                self.parser.run_worker(queue_path)
+            self.assertEqual(post.call_count, self.parser.ATTEMPTS_COUNT)
+            self.assertEqual(queue.unfinished_count(), 0)
+            self.assertEqual(queue.failed_count(self.parser.SEARCH_UNIT), 1)
+        finally:
+            queue.close()
+            shutil.rmtree(queue_dir)
+
+    def test_worker_unavailable_site(self):
+        """
+        Test search unit with error responses is failed, not done
+        :return:
+        """
+        from work_queue import WorkQueue
+        queue_dir = tempfile.mkdtemp()
+        queue_path = os.path.join(queue_dir, 'queue.sqlite')
+        queue = WorkQueue(queue_path)
+        queue.put(self.parser.SEARCH_UNIT, [{'pos': 'MINIJOB'}])
+        queue.close_queue()
+        self.parser.POLL_INTERVAL = 0
+        response = mock.Mock(status_code=503, url=self.parser.DEFAULT_URL)
+        response.json.side_effect = ValueError
+        try:
+            with mock.patch('mcdonalds_parser.rq.post',
+                            return_value=response) as post:
+                self.parser.run_worker(queue_path)
+            self.assertEqual(post.call_count, self.parser.ATTEMPTS_COUNT * (
+                self.parser.ATTEMPTS_COUNT + 1))
+            self.assertEqual(queue.failed_count(self.parser.SEARCH_UNIT), 1)
+            self.assertEqual(list(queue.results(self.parser.SEARCH_UNIT)),
+                             [])
+        finally:
+            queue.close()
+            shutil.rmtree(queue_dir)
+
+    def test_worker_waits_for_new_run(self):
+        """
+        Test worker started after finished run waits for the next run
+        :return:
+        """
+        from work_queue import WorkQueue
+        queue_dir = tempfile.mkdtemp()
+        queue_path = os.path.join(queue_dir, 'queue.sqlite')
+        queue = WorkQueue(queue_path)
+        queue.reset()
+        queue.close_queue()
+        self.parser.POLL_INTERVAL = 0.01
+        try:
+            with mock.patch('mcdonalds_parser.rq.post',
+                            side_effect=ConnectionError):
+                thread = threading.Thread(target=self.parser.run_worker,
+                                          args=(queue_path,))
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())
+
+                queue.reset()
+                queue.put(self.parser.SEARCH_UNIT, [{'pos': 'MINIJOB'}])
+                queue.close_queue()
+                thread.join(10)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(queue.failed_count(self.parser.SEARCH_UNIT), 1)
+        finally:
+            queue.close()
+            shutil.rmtree(queue_dir)
+
+    def test_coordinator(self):
+        """
+        Test coordinator merges results of worker and exports them once
+        :return:
+        """
+        from mcdonalds_parser import McDonaldsParser
+        from work_queue import WorkQueue
+        server = VacancyPageServer(('127.0.0.1', 0), VacancyPageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        queue_dir = tempfile.mkdtemp()
+        queue_path = os.path.join(queue_dir, 'queue.sqlite')
+        self.parser.DIR_TO_EXPORT = queue_dir
+        worker = McDonaldsParser(fetch_backend='threads')
+        worker_threads = []
+
+        def start_worker(path, workers_num):
+            # worker runs in a thread of this process instead of subprocess
+            thread = threading.Thread(target=worker.run_worker, args=(path,))
+            thread.start()
+            worker_threads.append(thread)
+            return []
+
+        response = mock.Mock(status_code=200)
+        response.json.return_value = COORDINATOR_SEARCH_JSON
+        site_url = 'http://127.0.0.1:{}'.format(server.server_port)
+        try:
+            with mock.patch.object(McDonaldsParser, 'SITE_URL', site_url), \
+                    mock.patch.object(McDonaldsParser, 'POLL_INTERVAL',
+                                      0.01), \
+                    mock.patch('mcdonalds_parser.rq.post',
+                               return_value=response), \
+                    mock.patch.object(self.parser, '_start_workers',
+                                      side_effect=start_worker):
+                filepath = self.parser.run_coordinator(queue_path, 0)
+                worker_threads[0].join(10)
+            self.assertFalse(worker_threads[0].is_alive())
+
+            self.assertEqual(
+                {job_id: vacancy['description']
+                 for job_id, vacancy in self.parser.vacancy_dict.items()},
+                COORDINATOR_DESCRIPTIONS)
+            self.assertEqual(len(self.parser.descriptions), 2)
+            root = etree.parse(filepath).getroot()
+            self.assertEqual(
+                {position.findtext('identifier'):
+                    position.findtext('description')
+                 for position in root.findall('position')},
+                COORDINATOR_DESCRIPTIONS)
+
+            queue = WorkQueue(queue_path)
+            self.assertEqual(queue.unfinished_count(), 0)
+            self.assertEqual(
+                queue.failed_count(self.parser.DESCRIPTION_UNIT), 0)
+            queue.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(queue_dir)
+
+    def test_wait_for_exited_workers(self):
+        """
+        Test coordinator stops waiting when all local workers exited
+        :return:
+        """
+        from work_queue import WorkQueue
+        queue_dir = tempfile.mkdtemp()
+        queue = WorkQueue(os.path.join(queue_dir, 'queue.sqlite'))
+        queue.put(self.parser.SEARCH_UNIT, [{}])
+        self.parser.POLL_INTERVAL = 0
+        process = mock.Mock(**{'poll.return_value': 1})
+        try:
+            with self.assertRaises(RuntimeError):
+                self.parser._wait_for_units(queue, self.parser.SEARCH_UNIT,
+                                            [process])
+        finally:
+            queue.close()
+            shutil.rmtree(queue_dir)
+
+    def test_batch_callback(self):
+        """
+        Test batch callback is called after each batch of requests
+        :return:
+        """
+        self.parser._parse_json(self.test_data)
+        self.parser.batch_callback = mock.Mock()
+        url_list = self.parser._get_url_list()[:self.parser.MAX_ID + 1]
+        with mock.patch.object(self.parser, '_get_description',
+                               return_value=[]):
+            self.parser._prepare_data(url_list)
+        self.assertEqual(self.parser.batch_callback.call_count, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import pstats
+import shutil
+import tempfile
+import unittest
+
+sys.path.append('..')
+
+from profiling import Profiler, dumps_profiles, profile_phase
+
+
+def busy_loop():
+    """
+    Function which takes some time to be sampled
+    """
+    return sum(len(str(i)) for i in range(300000))
+
+
+class ProfilingTestCase(unittest.TestCase):
+    """
+    Profiler tests
+    """
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_phase_files(self):
+        """
+        Test profiles of phase are saved
+        :return:
+        """
+        profiler = Profiler(self.output_dir)
+        for _ in range(2):
+            with profile_phase(profiler, 'export'):
+                busy_loop()
+        # allocations are written for each call of phase
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ['export-1.alloc.snapshot', 'export-1.alloc.txt',
+                          'export-2.alloc.snapshot', 'export-2.alloc.txt'])
+        profiler.dump()
+        for extension in ('.prof', '.txt', '.collapsed'):
+            self.assertTrue(os.path.exists(
+                os.path.join(self.output_dir, 'export' + extension)))
+        with open(os.path.join(self.output_dir, 'export.txt')) as f:
+            self.assertIn('busy_loop', f.read())
+        # both calls are accumulated
+        stats = pstats.Stats(os.path.join(self.output_dir, 'export.prof'))
+        self.assertEqual([call_stats[0]
+                          for function, call_stats in stats.stats.items()
+                          if function[2] == 'busy_loop'], [2])
+        with open(os.path.join(self.output_dir, 'export.collapsed')) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('busy_loop' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit()
+                            for line in lines))
+
+    def test_profiling_off(self):
+        """
+        Test nothing is saved without profiler
+        :return:
+        """
+        with profile_phase(None, 'export'):
+            busy_loop()
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_dumps_profiles(self):
+        """
+        Test profiles are written when entry point fails
+        :return:
+        """
+        class Crawler:
+            profiler = Profiler(self.output_dir, memory=False)
+
+            @dumps_profiles
+            def run(self):
+                with profile_phase(self.profiler, 'search'):
+                    busy_loop()
+                raise ValueError
+
+        with self.assertRaises(ValueError):
+            Crawler().run()
+        self.assertTrue(os.path.exists(
+            os.path.join(self.output_dir, 'search.prof')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append('..')
+
+from work_queue import WorkQueue
+
+
+class WorkQueueTestCase(unittest.TestCase):
+    """
+    Work queue tests
+    """
+
+    def setUp(self):
+        self.queue_dir = tempfile.mkdtemp()
+        self.queue_path = os.path.join(self.queue_dir, 'queue.sqlite')
+        self.queue = WorkQueue(self.queue_path, lease_seconds=60)
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.queue_dir)
+
+    def test_claim_and_complete(self):
+        """
+        Test units are claimed once and results are stored
+        :return:
+        """
+        self.queue.put('search', [{'pos': 'MINIJOB'}, {'pos': 'INT_VW_BE'}])
+        first = self.queue.claim('worker-1')
+        second = self.queue.claim('worker-2')
+        self.assertEqual(first[1:], ('search', {'pos': 'MINIJOB'}))
+        self.assertEqual(second[1:], ('search', {'pos': 'INT_VW_BE'}))
+        self.assertIsNone(self.queue.claim('worker-3'))
+
+        self.assertTrue(self.queue.complete(first[0], 'worker-1', {'a': 1}))
+        self.assertFalse(self.queue.complete(second[0], 'worker-1', {}))
+        self.assertEqual(self.queue.unfinished_count('search'), 1)
+        self.assertTrue(self.queue.complete(second[0], 'worker-2', {'b': 2}))
+        self.assertEqual(self.queue.unfinished_count(), 0)
+        self.assertEqual(list(self.queue.results('search')),
+                         [{'a': 1}, {'b': 2}])
+
+    def test_expired_lease(self):
+        """
+        Test unit with expired lease is claimed by another worker
+        :return:
+        """
+        self.queue.put('description', [{'req1655': 'url'}])
+        self.queue.lease_seconds = -1
+        unit_id = self.queue.claim('worker-1')[0]
+        self.assertEqual(self.queue.claim('worker-2')[0], unit_id)
+        self.assertFalse(self.queue.complete(unit_id, 'worker-1', {}))
+        self.assertTrue(self.queue.complete(unit_id, 'worker-2', {}))
+
+    def test_release_and_close(self):
+        """
+        Test released unit returns to queue and queue closing
+        :return:
+        """
+        self.queue.put('search', [{}])
+        unit_id = self.queue.claim('worker-1')[0]
+        self.queue.release(unit_id, 'worker-1')
+        self.assertEqual(self.queue.claim('worker-2')[0], unit_id)
+        self.assertFalse(self.queue.is_closed)
+        self.queue.close_queue()
+        self.assertTrue(WorkQueue(self.queue_path).is_closed)
+        self.queue.reset()
+        self.assertFalse(self.queue.is_closed)
+        self.assertEqual(self.queue.unfinished_count(), 0)
+
+    def test_max_attempts(self):
+        """
+        Test unit is failed after max attempts
+        :return:
+        """
+        queue = WorkQueue(self.queue_path, max_attempts=2)
+        queue.put('search', [{}])
+        unit_id = queue.claim('worker-1')[0]
+        self.assertTrue(queue.release(unit_id, 'worker-1'))
+        self.assertEqual(queue.claim('worker-1')[0], unit_id)
+        self.assertFalse(queue.release(unit_id, 'worker-1'))
+        self.assertIsNone(queue.claim('worker-1'))
+        self.assertEqual(queue.unfinished_count(), 0)
+        self.assertEqual(queue.failed_count('search'), 1)
+        self.assertEqual(list(queue.results('search')), [])
+        queue.close()
+
+    def test_max_attempts_expired_lease(self):
+        """
+        Test unit of crashed workers is failed after max attempts
+        :return:
+        """
+        queue = WorkQueue(self.queue_path, lease_seconds=-1, max_attempts=2)
+        queue.put('search', [{}])
+        unit_id = queue.claim('worker-1')[0]
+        self.assertEqual(queue.claim('worker-2')[0], unit_id)
+        self.assertIsNone(queue.claim('worker-3'))
+        self.assertEqual(queue.failed_count('search'), 1)
+        queue.close()
+
+    def test_renew(self):
+        """
+        Test renewing lease keeps unit from other workers
+        :return:
+        """
+        self.queue.put('description', [{}])
+        self.queue.lease_seconds = -1
+        unit_id = self.queue.claim('worker-1')[0]
+        self.assertEqual(self.queue.live_leases_count(), 0)
+        self.queue.lease_seconds = 60
+        self.assertTrue(self.queue.renew(unit_id, 'worker-1'))
+        self.assertEqual(self.queue.live_leases_count(), 1)
+        self.assertIsNone(self.queue.claim('worker-2'))
+        self.assertFalse(self.queue.renew(unit_id, 'worker-2'))
+
+    def test_run_id(self):
+        """
+        Test reset starts a new unfinished run
+        :return:
+        """
+        self.assertIsNone(self.queue.run_id)
+        self.queue.reset()
+        run_id = self.queue.run_id
+        self.assertIsNotNone(run_id)
+        self.queue.close_queue()
+        self.assertTrue(self.queue.is_finished)
+        self.queue.reset()
+        self.assertNotEqual(self.queue.run_id, run_id)
+        self.assertFalse(self.queue.is_finished)
+        self.queue.put('search', [{}])
+        self.queue.close_queue()
+        self.assertFalse(self.queue.is_finished)
+
+
+if __name__ == '__main__':
+    unittest.main()
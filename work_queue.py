@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+
+
+class WorkQueue:
+    """
+    Work queue stored in a local SQLite file. Units are claimed with
+    leases, so a unit held by a crashed worker is given to another one
+    after its lease expires. A unit which was claimed max_attempts times
+    without success is marked as failed.
+    SQLite relies on file locks, so the file can be shared between hosts
+    only on NFS with working locking (lockd for NFSv3, or NFSv4). Other
+    network filesystems (SMB/CIFS, sshfs, FUSE mounts of object storage)
+    are not supported.
+    """
+    PENDING = 'pending'
+    LEASED = 'leased'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # seconds after which a claimed unit may be claimed again,
+    # workers renew the lease while processing a unit
+    LEASE_SECONDS = 300
+    # seconds to wait for a lock on the database file
+    LOCK_TIMEOUT = 60
+
+    def __init__(self, path, lease_seconds=None, max_attempts=None):
+        """
+        Init class
+        :param path: path to SQLite file with queue
+        :param lease_seconds: lease duration of a claimed unit
+        :param max_attempts: number of claims after which unit is failed,
+                             unlimited if None
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds or self.LEASE_SECONDS
+        self.max_attempts = max_attempts
+        queue_dir = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(queue_dir):
+            os.makedirs(queue_dir)
+        self.connection = sqlite3.connect(path, timeout=self.LOCK_TIMEOUT,
+                                          isolation_level=None)
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Create queue tables if they do not exist
+        """
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS units ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'kind TEXT NOT NULL, '
+            'payload TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'owner TEXT, '
+            'lease_expires REAL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'result TEXT)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            'key TEXT PRIMARY KEY, value TEXT)')
+
+    def close(self):
+        """
+        Close connection to queue file
+        """
+        self.connection.close()
+
+    def reset(self):
+        """
+        Remove all units and state left from previous run and start
+        a new run with new run id
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute('DELETE FROM units')
+            self.connection.execute('DELETE FROM state')
+            self.connection.execute(
+                'INSERT INTO state (key, value) VALUES (?, ?)',
+                ('run_id', uuid.uuid4().hex))
+
+    def put(self, kind, payloads):
+        """
+        Add work units to queue
+        :param kind: kind of units
+        :param payloads: list of json serializable payloads
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.executemany(
+                'INSERT INTO units (kind, payload, status) VALUES (?, ?, ?)',
+                [(kind, json.dumps(payload), self.PENDING)
+                 for payload in payloads])
+        logging.info('Queued {} units of kind {}'.format(len(payloads), kind))
+
+    def claim(self, owner):
+        """
+        Claim one pending unit or unit with expired lease
+        :param owner: worker identifier
+        :return: tuple (unit id, kind, payload) or None if nothing to claim
+        """
+        now = time.time()
+        with self.connection:
+            # lock the file for writing, so two workers can not claim
+            # the same unit
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self.max_attempts is not None:
+                # units whose workers crashed max_attempts times are not
+                # given out again
+                self.connection.execute(
+                    'UPDATE units SET status = ?, lease_expires = NULL '
+                    'WHERE status = ? AND lease_expires < ? '
+                    'AND attempts >= ?',
+                    (self.FAILED, self.LEASED, now, self.max_attempts))
+            row = self.connection.execute(
+                'SELECT id, kind, payload FROM units '
+                'WHERE status = ? OR (status = ? AND lease_expires < ?) '
+                'ORDER BY id LIMIT 1',
+                (self.PENDING, self.LEASED, now)).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE units SET status = ?, owner = ?, lease_expires = ?, '
+                'attempts = attempts + 1 WHERE id = ?',
+                (self.LEASED, owner, now + self.lease_seconds, row[0]))
+        return row[0], row[1], json.loads(row[2])
+
+    def complete(self, unit_id, owner, result):
+        """
+        Mark unit as done and store its result. The result is ignored
+        if the lease was lost to another worker.
+        :param unit_id: unit id
+        :param owner: worker identifier
+        :param result: json serializable result
+        :return: True if result was stored
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            cursor = self.connection.execute(
+                'UPDATE units SET status = ?, result = ?, '
+                'lease_expires = NULL WHERE id = ? AND owner = ? '
+                'AND status = ?',
+                (self.DONE, json.dumps(result), unit_id, owner, self.LEASED))
+        return cursor.rowcount == 1
+
+    def renew(self, unit_id, owner):
+        """
+        Extend lease of claimed unit by lease_seconds from now
+        :param unit_id: unit id
+        :param owner: worker identifier
+        :return: True if lease is still held by owner
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            cursor = self.connection.execute(
+                'UPDATE units SET lease_expires = ? '
+                'WHERE id = ? AND owner = ? AND status = ?',
+                (time.time() + self.lease_seconds, unit_id, owner,
+                 self.LEASED))
+        return cursor.rowcount == 1
+
+    def release(self, unit_id, owner):
+        """
+        Return claimed unit to queue, so it can be claimed again, or mark
+        it as failed if it was claimed max_attempts times
+        :param unit_id: unit id
+        :param owner: worker identifier
+        :return: False if unit was marked as failed
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self.max_attempts is not None:
+                cursor = self.connection.execute(
+                    'UPDATE units SET status = ?, lease_expires = NULL '
+                    'WHERE id = ? AND owner = ? AND status = ? '
+                    'AND attempts >= ?',
+                    (self.FAILED, unit_id, owner, self.LEASED,
+                     self.max_attempts))
+                if cursor.rowcount == 1:
+                    return False
+            self.connection.execute(
+                'UPDATE units SET status = ?, owner = NULL, '
+                'lease_expires = NULL WHERE id = ? AND owner = ? '
+                'AND status = ?',
+                (self.PENDING, unit_id, owner, self.LEASED))
+        return True
+
+    def unfinished_count(self, kind=None):
+        """
+        :param kind: kind of units, all units if None
+        :return: number of pending and leased units
+        """
+        if kind is None:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM units WHERE status IN (?, ?)',
+                (self.PENDING, self.LEASED)).fetchone()[0]
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM units WHERE kind = ? AND status IN (?, ?)',
+            (kind, self.PENDING, self.LEASED)).fetchone()[0]
+
+    def live_leases_count(self):
+        """
+        :return: number of units held by workers with unexpired lease
+        """
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM units WHERE status = ? '
+            'AND lease_expires >= ?',
+            (self.LEASED, time.time())).fetchone()[0]
+
+    def failed_count(self, kind):
+        """
+        :param kind: kind of units
+        :return: number of units marked as failed
+        """
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM units WHERE kind = ? AND status = ?',
+            (kind, self.FAILED)).fetchone()[0]
+
+    def results(self, kind):
+        """
+        Results of done units
+        :param kind: kind of units
+        :return: generator of results
+        """
+        rows = self.connection.execute(
+            'SELECT result FROM units WHERE kind = ? AND status = ? '
+            'ORDER BY id', (kind, self.DONE))
+        for row in rows:
+            yield json.loads(row[0])
+
+    def close_queue(self):
+        """
+        Tell workers that no more units will be added
+        """
+        with self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            self.connection.execute(
+                'INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)',
+                ('closed', '1'))
+
+    @property
+    def is_closed(self):
+        """
+        :return: True if coordinator finished adding units
+        """
+        row = self.connection.execute(
+            'SELECT value FROM state WHERE key = ?', ('closed',)).fetchone()
+        return row is not None
+
+    @property
+    def is_finished(self):
+        """
+        :return: True if queue is closed and all units are done or failed
+        """
+        return self.is_closed and self.unfinished_count() == 0
+
+    @property
+    def run_id(self):
+        """
+        :return: id of current run, None if coordinator did not start a run
+        """
+        row = self.connection.execute(
+            'SELECT value FROM state WHERE key = ?', ('run_id',)).fetchone()
+        return row[0] if row else None